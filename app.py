@@ -1,22 +1,83 @@
 # app.py
-from flask import Flask, request, jsonify, render_template
-import json
 import os
-from datetime import datetime
+
+# Patch blocking I/O before anything else is imported when running on gevent
+if os.environ.get("GEVENT") == "1":
+    from gevent import monkey
+    monkey.patch_all()
+
+from flask import Flask, Response, request, jsonify, render_template, send_file, stream_with_context
+from flask.json.provider import JSONProvider
+from werkzeug.exceptions import RequestEntityTooLarge
+import asyncio
+import atexit
+import functools
+import hashlib
+import io
+import logging
+import logging.handlers
+import math
+import orjson
+import queue
+import re
+import secrets
+import sqlite3
+import threading
+import tiktoken
+import time
+from cachetools import TTLCache
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from datetime import date, datetime, timedelta, timezone
+from types import MappingProxyType
 from fpdf import FPDF
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+# Logging - the QueueHandler builds each message on the calling thread, then
+# the listener's background thread does the final formatting and the stdout
+# write, so request threads never block on stdout
+_log_queue = queue.SimpleQueue()
+_log_handler = logging.StreamHandler()
+_log_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+_log_listener = logging.handlers.QueueListener(_log_queue, _log_handler)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
+_log_level = os.environ.get("LOG_LEVEL", "INFO").upper()
+_log_level_valid = isinstance(logging.getLevelName(_log_level), int)
+if not _log_level_valid:
+    _log_level = "INFO"
+
+logging.basicConfig(
+    level=_log_level,
+    format="%(message)s",
+    handlers=[logging.handlers.QueueHandler(_log_queue)]
+)
+log = logging.getLogger(__name__)
+if not _log_level_valid:
+    log.warning("Unknown LOG_LEVEL %r, using INFO", os.environ["LOG_LEVEL"])
+
+class OrjsonProvider(JSONProvider):
+    """Flask JSON provider backed by orjson"""
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 
 # Get API key for Groq
 api_key = os.environ.get("GROQ_API_KEY")
 
 if not api_key:
-    print("ERROR: GROQ_API_KEY environment variable is not set!")
-    print("Please add GROQ_API_KEY to your .env file")
+    log.error("GROQ_API_KEY environment variable is not set!")
+    log.error("Please add GROQ_API_KEY to your .env file")
     exit(1)
 
 # Set environment variable for litellm
@@ -24,48 +85,237 @@ os.environ["GROQ_API_KEY"] = api_key
 
 # Import litellm and CrewAI
 import litellm
-from crewai import Agent, Task, Crew
+from crewai import Agent, Task, Crew, LLM
 
 litellm.set_verbose = False
 
-# Store plans in memory
-study_plans = {}
+# Disk stores are SQLite files holding one (key, created, value) table. WAL
+# mode lets other processes (like the reloader) open the same file, and
+# expired rows are removed with an indexed delete on created, without
+# reading them back. Callers serialize access with the store's lock
+def _open_store(path):
+    """Open a disk store, creating its table if needed"""
+    store = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+    store.execute("PRAGMA journal_mode=WAL")
+    store.execute("PRAGMA synchronous=NORMAL")
+    store.execute(
+        "CREATE TABLE IF NOT EXISTS entries "
+        "(key TEXT PRIMARY KEY, created REAL NOT NULL, value BLOB NOT NULL)"
+    )
+    store.execute("CREATE INDEX IF NOT EXISTS entries_created ON entries (created)")
+    return store
+
+def _store_get(store, key):
+    """Return (created, value) for a key, or None"""
+    return store.execute("SELECT created, value FROM entries WHERE key = ?", (key,)).fetchone()
+
+def _store_put(store, key, created, value):
+    store.execute(
+        "INSERT OR REPLACE INTO entries (key, created, value) VALUES (?, ?, ?)",
+        (key, created, value)
+    )
+
+def _store_delete(store, key):
+    """Delete a key, returning whether it existed"""
+    return store.execute("DELETE FROM entries WHERE key = ?", (key,)).rowcount > 0
+
+def _store_sweep(store, ttl):
+    """Delete entries older than ttl"""
+    store.execute("DELETE FROM entries WHERE created < ?", (time.time() - ttl,))
+
+# Store plans in a bounded in-memory cache, backed by a disk store so
+# evicted plans can still be served. Memory entries are (created, plan)
+plan_ttl = int(os.environ.get("PLAN_TTL", 24 * 3600))
+plan_store_path = os.environ.get("PLAN_STORE_PATH", "study_plans.sqlite3")
+study_plans = TTLCache(maxsize=int(os.environ.get("MAX_PLANS_IN_MEMORY", 1024)), ttl=plan_ttl)
+_plan_store = _open_store(plan_store_path)
+_plan_lock = threading.Lock()
+_plan_store_last_sweep = 0
+
+# Rendered PDFs and their ETags, keyed by plan id
+plan_pdfs = TTLCache(maxsize=int(os.environ.get("MAX_PDFS_IN_MEMORY", 256)), ttl=plan_ttl)
 
-# LLM configuration - Groq (using Llama model)
-llm = "groq/llama-3.3-70b-versatile"
-print(f"✓ Using LLM: {llm}")
+# Parallel crew execution settings - crews run via kickoff_async on a
+# shared event loop owned by a background thread. kickoff_async runs each
+# crew in the loop's default executor, sized to CREW_THREADS; cache I/O gets
+# its own small pool so it never queues behind crews. CREW_TIMEOUT counts
+# from when a crew gets a thread, and is also the HTTP timeout of each LLM
+# request, so a crew abandoned at the deadline doesn't hold its thread long
+max_parallel_agents = int(os.environ.get("MAX_PARALLEL_AGENTS", 2))
+crew_threads = int(os.environ.get("CREW_THREADS", 64))
+crew_timeout = int(os.environ.get("CREW_TIMEOUT", 60))
+fail_fast = os.environ.get("FAIL_FAST", "false").lower() == "true"
+_event_loop = asyncio.new_event_loop()
+_event_loop.set_default_executor(ThreadPoolExecutor(max_workers=crew_threads, thread_name_prefix="crew"))
+_io_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="store")
+_crew_slots = asyncio.Semaphore(crew_threads)
+threading.Thread(target=_event_loop.run_forever, daemon=True).start()
+
+# Syllabus input limits - oversized requests are rejected before parsing and
+# the syllabus is truncated by tokens rather than characters
+MAX_SYLLABUS_BYTES = 256 * 1024
+MAX_SYLLABUS_TOKENS = 2000
+app.config["MAX_CONTENT_LENGTH"] = MAX_SYLLABUS_BYTES
+try:
+    _encoder = tiktoken.get_encoding("cl100k_base")
+except Exception as e:
+    log.warning("✗ Could not load tokenizer, truncating by characters: %s", e)
+    _encoder = None
+
+# Syllabus chunking - each unit is analyzed (and cached) separately so
+# edits to one unit only re-hit the LLM for that unit. Chunks of one plan
+# run together, up to MAX_PARALLEL_CHUNKS at a time
+max_syllabus_chunks = int(os.environ.get("MAX_SYLLABUS_CHUNKS", 12))
+max_parallel_chunks = int(os.environ.get("MAX_PARALLEL_CHUNKS", max_syllabus_chunks))
+
+# Heading levels, outermost first; the syllabus is split on the outermost
+# level present so chapters stay inside their unit
+_SYLLABUS_HEADING_LEVELS = (
+    re.compile(r"^[ \t]*(?:unit|module)\b", re.IGNORECASE | re.MULTILINE),
+    re.compile(r"^[ \t]*chapter\b", re.IGNORECASE | re.MULTILINE)
+)
+_PARAGRAPH_RE = re.compile(r"\n\s*\n")
+
+# Learning style keywords, checked in priority order
+_STYLE_RE = re.compile(r"visual|auditory|audio|kinesthetic|hands", re.IGNORECASE)
+_STYLE_KEYWORDS = {
+    "visual": "visual",
+    "audio": "auditory",
+    "auditory": "auditory",
+    "kinesthetic": "kinesthetic",
+    "hands": "kinesthetic"
+}
+_STYLE_PRIORITY = ("visual", "auditory", "kinesthetic")
+_STUDY_METHODS = MappingProxyType({
+    "visual": ("video lectures", "diagrams", "mind maps", "flashcards"),
+    "auditory": ("podcasts", "audio books", "group discussions", "lectures"),
+    "kinesthetic": ("hands-on practice", "labs", "projects", "simulations"),
+    "reading-writing": ("textbooks", "note-taking", "written summaries", "articles")
+})
+
+# Study session times for locally generated schedules, and bounds on the
+# user-supplied duration and LLM-estimated chapter hours that size them
+SCHEDULE_SLOT_TIMES = ("09:00-11:00", "14:00-16:00")
+MAX_STUDY_DURATION_DAYS = 365
+MAX_CHAPTER_HOURS = 100
+
+# Matches a leading ```/```json fence up to the first closing fence
+_FENCE_RE = re.compile(r"```[^\n]*\n(.*?)\n\s*```", re.DOTALL)
+
+# LLM configuration - Groq (using Llama models). The lighter Resource
+# Recommender task runs on a smaller model, and GROQ_API_KEYS may list several
+# comma-separated keys to spread load over more rate-limit quota
+llm = os.environ.get("LLM_MODEL", "groq/llama-3.3-70b-versatile")
+resource_llm = os.environ.get("RESOURCE_LLM_MODEL", "groq/llama-3.1-8b-instant")
+api_keys = [key.strip() for key in os.environ.get("GROQ_API_KEYS", api_key).split(",") if key.strip()]
+log.info("✓ Using LLM: %s (resources: %s, %d API key(s))", llm, resource_llm, len(api_keys))
+
+# LLM response cache - entries are keyed on the model string so switching
+# models invalidates them, and expire after LLM_CACHE_TTL seconds. Expired
+# entries are swept from the disk store at most every STORE_SWEEP_INTERVAL
+llm_cache_path = os.environ.get("LLM_CACHE_PATH", "llm_cache.sqlite3")
+llm_cache_ttl = int(os.environ.get("LLM_CACHE_TTL", 7 * 24 * 3600))
+store_sweep_interval = int(os.environ.get("STORE_SWEEP_INTERVAL", 3600))
+_llm_cache = TTLCache(maxsize=int(os.environ.get("LLM_CACHE_MAX_ENTRIES", 1024)), ttl=llm_cache_ttl)
+_llm_cache_lock = threading.Lock()
+_llm_cache_store = _open_store(llm_cache_path)
+_llm_cache_last_sweep = 0
 
 # ========================================================================
 # CREATE AGENTS
 # ========================================================================
 
-print("Creating agents...")
+log.info("Creating agents...")
 
-syllabus_analyzer = Agent(
+def _build_agents(model, **config):
+    """Create one template agent per API key; crews copy the least busy one"""
+    return [
+        Agent(llm=LLM(model=model, api_key=key, timeout=crew_timeout), verbose=False, **config)
+        for key in api_keys
+    ]
+
+syllabus_analyzers = _build_agents(
+    llm,
     role="Syllabus Analyzer",
     goal="Break down syllabus text into structured topics with time estimates",
-    backstory="Expert at analyzing educational content and creating structured learning paths",
-    llm=llm,
-    verbose=False
+    backstory="Expert at analyzing educational content and creating structured learning paths"
 )
 
-schedule_architect = Agent(
-    role="Schedule Architect", 
+schedule_architects = _build_agents(
+    llm,
+    role="Schedule Architect",
     goal="Create practical day-by-day study schedules",
-    backstory="Specialist in time management and creating realistic study plans",
-    llm=llm,
-    verbose=False
+    backstory="Specialist in time management and creating realistic study plans"
 )
 
-resource_recommender = Agent(
+resource_recommenders = _build_agents(
+    resource_llm,
     role="Resource Recommender",
     goal="Suggest relevant study materials and resources",
-    backstory="Expert at matching learning resources to topics and learning styles",
-    llm=llm,
-    verbose=False
+    backstory="Expert at matching learning resources to topics and learning styles"
 )
 
-print("✓ Agents created successfully")
+# In-flight crew count per agent, for least-busy selection
+_agent_load = {}
+_agent_load_lock = threading.Lock()
+
+log.info("✓ Agents created successfully")
+
+# ========================================================================
+# PROMPTS
+# ========================================================================
+
+# Invariant instructions and schemas come first and the per-request input
+# last, so providers with prompt-prefix caching can reuse the shared prefix
+
+JSON_ONLY_INSTRUCTION = "Return ONLY valid JSON with no extra text."
+
+SYLLABUS_PROMPT_PREFIX = f"""Analyze the syllabus section given as INPUT. {JSON_ONLY_INSTRUCTION}
+
+Return JSON with this exact structure:
+{{
+  "subjects": [
+    {{
+      "name": "Subject Name",
+      "chapters": [
+        {{"name": "Chapter", "estimated_hours": 5, "difficulty": "medium"}}
+      ]
+    }}
+  ]
+}}"""
+
+SCHEDULE_PROMPT_PREFIX = f"""Create a day-by-day study schedule for the subjects, duration and learning style given as INPUT. {JSON_ONLY_INSTRUCTION}
+
+Return JSON with this structure:
+{{
+  "schedule": [
+    {{
+      "day": 1,
+      "date": "2025-12-03",
+      "sessions": [
+        {{"time": "09:00-11:00", "topic": "Topic", "activities": ["Read", "Practice"]}}
+      ]
+    }}
+  ]
+}}"""
+
+RESOURCE_PROMPT_PREFIX = f"""Recommend study resources for the topics and learning style given as INPUT. {JSON_ONLY_INSTRUCTION}
+
+Return JSON with this structure:
+{{
+  "resource_recommendations": [
+    {{
+      "topic": "Topic",
+      "resources": [
+        {{"type": "video", "name": "Resource Name", "description": "Why useful"}}
+      ]
+    }}
+  ]
+}}"""
+
+def build_prompt(prefix, body):
+    """Append the variable request input to an invariant prompt prefix"""
+    return f"{prefix}\n\nINPUT:\n{body}"
 
 # ========================================================================
 # HELPER FUNCTIONS
@@ -73,41 +323,33 @@ print("✓ Agents created successfully")
 
 def analyze_learning_preferences_local(prefs_text):
     """Simple local learning style analysis"""
-    prefs_lower = prefs_text.lower()
-    
-    primary = "reading-writing"
-    if "visual" in prefs_lower:
-        primary = "visual"
-    elif "audio" in prefs_lower or "auditory" in prefs_lower:
-        primary = "auditory"
-    elif "kinesthetic" in prefs_lower or "hands" in prefs_lower:
-        primary = "kinesthetic"
-    
-    methods = {
-        "visual": ["video lectures", "diagrams", "mind maps", "flashcards"],
-        "auditory": ["podcasts", "audio books", "group discussions", "lectures"],
-        "kinesthetic": ["hands-on practice", "labs", "projects", "simulations"],
-        "reading-writing": ["textbooks", "note-taking", "written summaries", "articles"]
-    }
+    # Single scan for all keywords, then pick by style priority
+    found = {_STYLE_KEYWORDS[m.lower()] for m in _STYLE_RE.findall(prefs_text)}
+    primary = next((style for style in _STYLE_PRIORITY if style in found), "reading-writing")
     
     return {
         "primary_learning_style": primary,
-        "recommended_study_methods": methods.get(primary, methods["reading-writing"]),
+        "recommended_study_methods": list(_STUDY_METHODS[primary]),
         "personalized_tips": "Use 45-90 minute focused sessions with breaks. Apply active recall and spaced repetition."
     }
 
+@functools.lru_cache(maxsize=1024)
+def _checkpoint_days(duration_days):
+    """Days of the four review checkpoints for a plan duration"""
+    interval = max(7, duration_days // 4)
+    return tuple(min(duration_days, i * interval) for i in range(1, 5))
+
 def generate_progress_tracking_local(duration_days):
     """Generate simple progress tracking"""
-    checkpoints = []
-    interval = max(7, duration_days // 4)
-    
-    for i in range(1, 5):
-        day = min(duration_days, i * interval)
-        checkpoints.append({
+    # Build fresh dicts on each call so stored plans never share objects
+    checkpoints = [
+        {
             "day": day,
             "checkpoint": f"Review Week {i}",
             "assessment": "Quiz + practical exercise"
-        })
+        }
+        for i, day in enumerate(_checkpoint_days(duration_days), start=1)
+    ]
     
     return {
         "checkpoint_schedule": checkpoints,
@@ -123,143 +365,401 @@ def extract_json_from_response(text):
     text = text.strip()
     
     # Remove code fences if present
-    if text.startswith('```'):
-        lines = text.split('\n')
-        start_idx = None
-        end_idx = None
-        
-        for i, line in enumerate(lines):
-            stripped = line.strip()
-            if stripped.startswith('```'):
-                if start_idx is None:
-                    start_idx = i + 1
-                else:
-                    end_idx = i
-                    break
-        
-        if start_idx and end_idx:
-            text = '\n'.join(lines[start_idx:end_idx]).strip()
+    match = _FENCE_RE.match(text)
+    if match:
+        text = match.group(1).strip()
     
     # Try to parse JSON
     try:
-        return json.loads(text)
-    except json.JSONDecodeError as e:
-        print(f"JSON parse error: {e}")
-        print(f"Text: {text[:200]}...")
+        return orjson.loads(text)
+    except orjson.JSONDecodeError as e:
+        # Salvage responses with stray text around the JSON object
+        start = text.find('{')
+        end = text.rfind('}')
+        if 0 <= start < end:
+            try:
+                return orjson.loads(text[start:end + 1])
+            except orjson.JSONDecodeError:
+                pass
+        
+        log.warning("JSON parse error: %s", e)
+        log.debug("Text: %.200s...", text)
         # Return minimal valid structure
         return {"error": "Failed to parse JSON response"}
 
+def _has_list_of_dicts(result, key):
+    """Check that an agent result is a dict holding a list of objects under key"""
+    return (
+        isinstance(result, dict)
+        and isinstance(result.get(key), list)
+        and all(isinstance(item, dict) for item in result[key])
+    )
+
+def _is_syllabus_result(result):
+    return _has_list_of_dicts(result, "subjects")
+
+def _is_schedule_result(result):
+    return _has_list_of_dicts(result, "schedule")
+
+def _is_resources_result(result):
+    return _has_list_of_dicts(result, "resource_recommendations")
+
+def _cache_key(task, agent):
+    """Build the LLM cache key for a task"""
+    raw = f"{agent.llm.model}\n{agent.role}\n{task.description}"
+    return hashlib.blake2b(raw.encode()).hexdigest()
+
+def _cache_get(key):
+    """Look up a cached result in memory, then on disk"""
+    with _llm_cache_lock:
+        entry = _llm_cache.get(key)
+        if entry is None:
+            row = _store_get(_llm_cache_store, key)
+            if row is None:
+                return None
+            entry = {"created": row[0], "result": orjson.loads(row[1])}
+            _llm_cache[key] = entry
+        
+        if time.time() - entry["created"] > llm_cache_ttl:
+            _llm_cache.pop(key, None)
+            _store_delete(_llm_cache_store, key)
+            return None
+        
+        return entry["result"]
+
+def _cache_set(key, result):
+    """Store a parsed result in memory and on disk"""
+    global _llm_cache_last_sweep
+    
+    entry = {"created": time.time(), "result": result}
+    with _llm_cache_lock:
+        _llm_cache[key] = entry
+        _store_put(_llm_cache_store, key, entry["created"], orjson.dumps(result))
+        
+        if entry["created"] - _llm_cache_last_sweep > store_sweep_interval:
+            _store_sweep(_llm_cache_store, llm_cache_ttl)
+            _llm_cache_last_sweep = entry["created"]
+
+@contextmanager
+def _acquire_agent(agents):
+    """Pick the agent with the fewest crews in flight"""
+    with _agent_load_lock:
+        agent = min(agents, key=lambda a: _agent_load.get(id(a), 0))
+        _agent_load[id(agent)] = _agent_load.get(id(agent), 0) + 1
+    try:
+        yield agent
+    finally:
+        with _agent_load_lock:
+            _agent_load[id(agent)] -= 1
+
+async def _run_crew(task, agents, is_valid):
+    """Run a single-agent crew on one of the given agents and parse its JSON output"""
+    key = _cache_key(task, agents[0])
+    loop = asyncio.get_running_loop()
+    # Store I/O blocks, so keep it off the event loop
+    cached = await loop.run_in_executor(_io_executor, _cache_get, key)
+    if cached is not None and is_valid(cached):
+        log.info("✓ Cache hit for %s", agents[0].role)
+        return cached
+    
+    # Wait for a free crew thread before starting the clock, so time spent
+    # queued doesn't count against CREW_TIMEOUT
+    await _crew_slots.acquire()
+    slot = ExitStack()
+    slot.callback(_crew_slots.release)
+    try:
+        template = slot.enter_context(_acquire_agent(agents))
+        # CrewAI keeps per-run state (crew, executor, messages) on the Agent,
+        # so concurrent crews each get their own copy sharing the LLM
+        agent = Agent(
+            role=template.role,
+            goal=template.goal,
+            backstory=template.backstory,
+            llm=template.llm,
+            verbose=False
+        )
+        task.agent = agent
+        crew = Crew(agents=[agent], tasks=[task], verbose=False)
+        run = asyncio.ensure_future(crew.kickoff_async())
+    except BaseException:
+        slot.close()
+        raise
+    
+    # A timed-out crew keeps running in its thread, so it holds its slot
+    # and agent until it actually finishes
+    def release(fut):
+        if not fut.cancelled():
+            fut.exception()  # Retrieve it so abandoned failures aren't reported as unhandled
+        slot.close()
+    run.add_done_callback(release)
+    
+    result = await asyncio.wait_for(asyncio.shield(run), timeout=crew_timeout)
+    parsed = extract_json_from_response(str(result))
+    
+    # Don't cache failed parses or unexpected shapes so the next request retries
+    if isinstance(parsed, dict) and "error" in parsed:
+        return parsed
+    if not is_valid(parsed):
+        log.warning("✗ %s returned an unexpected JSON shape", agents[0].role)
+        return {"error": f"{agents[0].role} returned an unexpected JSON shape"}
+    
+    await loop.run_in_executor(_io_executor, _cache_set, key, parsed)
+    return parsed
+
+def truncate_to_tokens(text, max_tokens):
+    """Truncate text to at most max_tokens tokens"""
+    if _encoder is None:
+        # Roughly 4 characters per token
+        return text[:max_tokens * 4]
+    
+    tokens = _encoder.encode(text)
+    if len(tokens) <= max_tokens:
+        return text
+    return _encoder.decode(tokens[:max_tokens])
+
+def _split_syllabus(text):
+    """Split syllabus text into one chunk per top-level unit heading"""
+    # Boundaries depend only on headings (or blank lines when there are
+    # none), so editing one unit leaves every other chunk unchanged
+    for heading_re in _SYLLABUS_HEADING_LEVELS:
+        starts = [m.start() for m in heading_re.finditer(text)]
+        if starts:
+            ends = starts[1:] + [len(text)]
+            pieces = [text[start:end].strip() for start, end in zip(starts, ends)]
+            
+            # Any preamble belongs with the first unit rather than its own call
+            preamble = text[:starts[0]].strip()
+            if preamble:
+                pieces[0] = f"{preamble}\n{pieces[0]}"
+            break
+    else:
+        pieces = [p.strip() for p in _PARAGRAPH_RE.split(text) if p.strip()]
+    
+    if not pieces:
+        return []
+    
+    # Too many units - group whole units by position to bound the LLM calls
+    size = math.ceil(len(pieces) / max_syllabus_chunks)
+    return ["\n".join(pieces[i:i + size]) for i in range(0, len(pieces), size)]
+
+def _syllabus_chunk_task(chunk):
+    """Build the syllabus analysis task for a single chunk"""
+    return Task(
+        description=build_prompt(SYLLABUS_PROMPT_PREFIX, chunk),
+        expected_output="JSON syllabus analysis",
+        agent=syllabus_analyzers[0]
+    )
+
+def _merge_syllabus_chunks(results):
+    """Merge per-chunk analyses into a single syllabus analysis"""
+    subjects = {}
+    failed_chunks = 0
+    for result in results:
+        # Anything but {"subjects": [{...}, ...]} counts as a failed chunk
+        if not _is_syllabus_result(result):
+            failed_chunks += 1
+            continue
+        for subject in result["subjects"]:
+            name = subject.get("name")
+            if not isinstance(name, str) or not name.strip():
+                name = "Unknown"
+            chapters = subject.get("chapters")
+            chapters = [c for c in chapters if isinstance(c, dict)] if isinstance(chapters, list) else []
+            if name in subjects:
+                subjects[name]["chapters"].extend(chapters)
+            else:
+                subjects[name] = {**subject, "name": name, "chapters": chapters}
+    
+    if not subjects:
+        return {"error": "Failed to analyze syllabus", "failed_chunks": failed_chunks}
+    
+    if failed_chunks:
+        log.warning("✗ %d of %d syllabus chunks failed; analysis is partial", failed_chunks, len(results))
+    
+    total_hours = 0
+    for subject in subjects.values():
+        for chapter in subject["chapters"]:
+            hours = chapter.get("estimated_hours", 0)
+            if isinstance(hours, (int, float)):
+                total_hours += hours
+    
+    return {
+        "subjects": list(subjects.values()),
+        "total_estimated_hours": total_hours,
+        "failed_chunks": failed_chunks
+    }
+
+def _generate_schedule_deterministic(subjects, duration_days, learning_style):
+    """Spread chapters over 2-hour study slots, two per day"""
+    methods = _STUDY_METHODS.get(learning_style, _STUDY_METHODS["reading-writing"])
+    
+    # Each chapter wants one slot per started 2 hours, in syllabus order
+    topics = []
+    wanted = []
+    for subject in subjects:
+        for chapter in subject.get("chapters", []):
+            hours = chapter.get("estimated_hours", 2)
+            if not isinstance(hours, (int, float)):
+                hours = 2
+            hours = min(max(hours, 0), MAX_CHAPTER_HOURS)
+            topics.append(f"{subject.get('name', 'Unknown')}: {chapter.get('name', 'Chapter')}")
+            wanted.append(max(1, math.ceil(hours / 2)))
+    
+    capacity = max(0, duration_days) * len(SCHEDULE_SLOT_TIMES)
+    if sum(wanted) <= capacity:
+        counts = wanted
+    elif len(topics) >= capacity:
+        # Fewer slots than chapters - cover an evenly spaced sample, once each
+        picked = {i * len(topics) // capacity for i in range(capacity)}
+        counts = [1 if i in picked else 0 for i in range(len(topics))]
+    else:
+        # Every chapter gets one slot, then the rest of the time is shared
+        # in proportion to the extra hours each wants (largest remainder)
+        spare = capacity - len(topics)
+        extra = [w - 1 for w in wanted]
+        total_extra = sum(extra)
+        shares = [e * spare / total_extra for e in extra]
+        counts = [1 + int(share) for share in shares]
+        leftover = capacity - sum(counts)
+        by_remainder = sorted(range(len(topics)), key=lambda i: shares[i] - int(shares[i]), reverse=True)
+        for i in by_remainder[:leftover]:
+            counts[i] += 1
+    
+    slots = [topic for topic, count in zip(topics, counts) for _ in range(count)]
+    
+    # Remaining slots revisit topics in order for spaced repetition
+    unique_topics = list(dict.fromkeys(slots))
+    
+    start = date.today()
+    schedule = []
+    for day in range(duration_days):
+        sessions = []
+        for i, time_range in enumerate(SCHEDULE_SLOT_TIMES):
+            slot = day * len(SCHEDULE_SLOT_TIMES) + i
+            if slot < len(slots):
+                topic = slots[slot]
+                activities = [methods[slot % len(methods)], methods[(slot + 1) % len(methods)]]
+            elif unique_topics:
+                topic = f"Review: {unique_topics[(slot - len(slots)) % len(unique_topics)]}"
+                activities = ["Active recall", "Practice problems"]
+            else:
+                continue
+            sessions.append({"time": time_range, "topic": topic, "activities": activities})
+        
+        schedule.append({
+            "day": day + 1,
+            "date": (start + timedelta(days=day)).isoformat(),
+            "sessions": sessions
+        })
+    
+    return {"schedule": schedule}
+
+async def _run_crews(jobs, limit=max_parallel_agents):
+    """Run (task, agents, name, is_valid) jobs concurrently, returning results in order"""
+    semaphore = asyncio.Semaphore(limit)
+    
+    async def run(task, agents, name, is_valid):
+        async with semaphore:
+            try:
+                return await _run_crew(task, agents, is_valid)
+            except Exception as e:
+                if fail_fast:
+                    raise
+                log.warning("✗ %s failed: %r", name, e)
+                return {"error": f"{name} failed: {e!r}"}
+    
+    return await asyncio.gather(*(run(*job) for job in jobs))
+
+def _run_async(coro):
+    """Run a coroutine on the shared event loop from synchronous code"""
+    return asyncio.run_coroutine_threadsafe(coro, _event_loop).result()
+
 # ========================================================================
 # STUDY PLAN GENERATION
 # ========================================================================
 
-def create_study_plan(syllabus_text, learning_preferences, study_duration_days):
-    """Generate comprehensive study plan"""
+async def create_study_plan(syllabus_text, learning_preferences, study_duration_days, on_stage=None):
+    """Generate comprehensive study plan, reporting each stage to on_stage(stage, data)"""
+    on_stage = on_stage or (lambda stage, data: None)
     
-    print("\n" + "="*80)
-    print("GENERATING STUDY PLAN")
-    print("="*80)
+    log.info("Generating study plan")
     
     try:
         # 1. Local learning analysis
-        print("\n[1/4] Analyzing learning preferences...")
+        log.info("[1/4] Analyzing learning preferences...")
         learning_analysis = analyze_learning_preferences_local(learning_preferences)
-        print("✓ Learning analysis complete")
+        log.info("✓ Learning analysis complete")
+        on_stage("learning_analysis", learning_analysis)
         
         # 2. Syllabus analysis
-        print("\n[2/4] Analyzing syllabus...")
-        syllabus_task = Task(
-            description=f"""Analyze this syllabus and return ONLY valid JSON with no extra text:
-
-SYLLABUS:
-{syllabus_text[:2000]}
-
-Return JSON with this exact structure:
-{{
-  "subjects": [
-    {{
-      "name": "Subject Name",
-      "chapters": [
-        {{"name": "Chapter", "estimated_hours": 5, "difficulty": "medium"}}
-      ]
-    }}
-  ],
-  "total_estimated_hours": 100
-}}""",
-            expected_output="JSON syllabus analysis",
-            agent=syllabus_analyzer
-        )
-        
-        syllabus_crew = Crew(agents=[syllabus_analyzer], tasks=[syllabus_task], verbose=False)
-        syllabus_result = syllabus_crew.kickoff()
-        syllabus_analysis = extract_json_from_response(str(syllabus_result))
-        print("✓ Syllabus analysis complete")
+        log.info("[2/4] Analyzing syllabus...")
+        chunks = _split_syllabus(truncate_to_tokens(syllabus_text, MAX_SYLLABUS_TOKENS))
+        chunk_results = await _run_crews([
+            (_syllabus_chunk_task(chunk), syllabus_analyzers, "Syllabus analysis", _is_syllabus_result)
+            for chunk in chunks
+        ], limit=max_parallel_chunks)
+        syllabus_analysis = _merge_syllabus_chunks(chunk_results)
+        log.info("✓ Syllabus analysis complete")
+        on_stage("syllabus_analysis", syllabus_analysis)
         
         # 3. Schedule creation
-        print("\n[3/4] Creating study schedule...")
-        schedule_task = Task(
-            description=f"""Create a {study_duration_days}-day study schedule. Return ONLY valid JSON with no extra text:
-
-Subjects: {json.dumps(syllabus_analysis.get('subjects', [])[:2])}
-Learning Style: {learning_analysis['primary_learning_style']}
-
-Return JSON with this structure:
-{{
-  "schedule": [
-    {{
-      "day": 1,
-      "date": "2025-12-03",
-      "sessions": [
-        {{"time": "09:00-11:00", "topic": "Topic", "activities": ["Read", "Practice"]}}
-      ]
-    }}
-  ]
-}}""",
-            expected_output="JSON schedule",
-            agent=schedule_architect
-        )
-        
-        schedule_crew = Crew(agents=[schedule_architect], tasks=[schedule_task], verbose=False)
-        schedule_result = schedule_crew.kickoff()
-        schedule = extract_json_from_response(str(schedule_result))
-        print("✓ Schedule created")
-        
-        # 4. Resource recommendations
-        print("\n[4/4] Recommending resources...")
+        log.info("[3/4] Creating study schedule...")
+        style = learning_analysis['primary_learning_style']
         topics = [s['name'] for s in syllabus_analysis.get('subjects', [])[:3]]
         resource_task = Task(
-            description=f"""Recommend study resources for: {', '.join(topics)}
-Learning style: {learning_analysis['primary_learning_style']}
-
-Return ONLY valid JSON with no extra text:
-{{
-  "resource_recommendations": [
-    {{
-      "topic": "Topic",
-      "resources": [
-        {{"type": "video", "name": "Resource Name", "description": "Why useful"}}
-      ]
-    }}
-  ]
-}}""",
+            description=build_prompt(
+                RESOURCE_PROMPT_PREFIX,
+                f"Topics: {', '.join(topics)}\n"
+                f"Learning Style: {style}"
+            ),
             expected_output="JSON resources",
-            agent=resource_recommender
+            agent=resource_recommenders[0]
         )
         
-        resource_crew = Crew(agents=[resource_recommender], tasks=[resource_task], verbose=False)
-        resource_result = resource_crew.kickoff()
-        resources = extract_json_from_response(str(resource_result))
-        print("✓ Resources recommended")
+        if "error" not in syllabus_analysis:
+            # Build the schedule locally; only resources need the LLM
+            schedule = _generate_schedule_deterministic(
+                syllabus_analysis.get('subjects', []), study_duration_days, style
+            )
+            log.info("✓ Schedule created")
+            on_stage("schedule", schedule)
+            
+            # 4. Resource recommendations
+            log.info("[4/4] Recommending resources...")
+            (resources,) = await _run_crews([
+                (resource_task, resource_recommenders, "Resource recommendation", _is_resources_result)
+            ])
+        else:
+            # Fall back to the Schedule Architect alongside resource recommendations
+            schedule_task = Task(
+                description=build_prompt(
+                    SCHEDULE_PROMPT_PREFIX,
+                    f"Duration: {study_duration_days} days\n"
+                    f"Subjects: {orjson.dumps(syllabus_analysis.get('subjects', [])[:2]).decode()}\n"
+                    f"Learning Style: {style}"
+                ),
+                expected_output="JSON schedule",
+                agent=schedule_architects[0]
+            )
+            
+            log.info("[4/4] Recommending resources...")
+            schedule, resources = await _run_crews([
+                (schedule_task, schedule_architects, "Schedule creation", _is_schedule_result),
+                (resource_task, resource_recommenders, "Resource recommendation", _is_resources_result)
+            ])
+            log.info("✓ Schedule created")
+            on_stage("schedule", schedule)
+        
+        log.info("✓ Resources recommended")
+        on_stage("resources", resources)
         
         # 5. Progress tracking (local)
         progress_system = generate_progress_tracking_local(study_duration_days)
         
-        print("\n" + "="*80)
-        print("✓ STUDY PLAN COMPLETE")
-        print("="*80 + "\n")
+        log.info("✓ Study plan complete")
         
         return {
-            "created_at": datetime.now().isoformat(),
+            "created_at": datetime.now(timezone.utc).isoformat(timespec='seconds'),
             "duration_days": study_duration_days,
             "syllabus_analysis": syllabus_analysis,
             "learning_analysis": learning_analysis,
@@ -269,9 +769,7 @@ Return ONLY valid JSON with no extra text:
         }
         
     except Exception as e:
-        print(f"✗ Error in study plan generation: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("✗ Error in study plan generation: %s", e)
         raise
 
 # ========================================================================
@@ -285,50 +783,135 @@ def generate_study_plan_pdf(study_plan):
     
     # Title
     pdf.set_font("Arial", "B", 16)
-    pdf.cell(0, 10, "Personalized Study Plan", ln=True, align='C')
+    pdf.cell(0, 10, "Personalized Study Plan", new_x="LMARGIN", new_y="NEXT", align='C')
     pdf.ln(5)
     
     # Metadata
     pdf.set_font("Arial", size=10)
-    pdf.cell(0, 5, f"Created: {study_plan['created_at'][:10]}", ln=True)
-    pdf.cell(0, 5, f"Duration: {study_plan['duration_days']} days", ln=True)
+    pdf.cell(0, 5, f"Created: {study_plan['created_at'][:10]}", new_x="LMARGIN", new_y="NEXT")
+    pdf.cell(0, 5, f"Duration: {study_plan['duration_days']} days", new_x="LMARGIN", new_y="NEXT")
     pdf.ln(5)
     
     # Syllabus
     pdf.set_font("Arial", "B", 12)
-    pdf.cell(0, 8, "1. Syllabus Overview", ln=True)
+    pdf.cell(0, 8, "1. Syllabus Overview", new_x="LMARGIN", new_y="NEXT")
     pdf.set_font("Arial", size=10)
     
     syllabus = study_plan.get('syllabus_analysis', {})
     if 'error' not in syllabus:
-        pdf.cell(0, 6, f"Total Hours: {syllabus.get('total_estimated_hours', 'N/A')}", ln=True)
+        pdf.cell(0, 6, f"Total Hours: {syllabus.get('total_estimated_hours', 'N/A')}", new_x="LMARGIN", new_y="NEXT")
         
         for subject in syllabus.get('subjects', [])[:3]:
-            pdf.cell(0, 6, f"- {subject.get('name', 'Unknown')}", ln=True)
+            pdf.cell(0, 6, f"- {subject.get('name', 'Unknown')}", new_x="LMARGIN", new_y="NEXT")
     pdf.ln(5)
     
     # Learning Style
     pdf.set_font("Arial", "B", 12)
-    pdf.cell(0, 8, "2. Learning Approach", ln=True)
+    pdf.cell(0, 8, "2. Learning Approach", new_x="LMARGIN", new_y="NEXT")
     pdf.set_font("Arial", size=10)
     
     learning = study_plan.get('learning_analysis', {})
-    pdf.cell(0, 6, f"Style: {learning.get('primary_learning_style', 'N/A')}", ln=True)
+    pdf.cell(0, 6, f"Style: {learning.get('primary_learning_style', 'N/A')}", new_x="LMARGIN", new_y="NEXT")
     pdf.ln(5)
     
     # Schedule Sample
     pdf.set_font("Arial", "B", 12)
-    pdf.cell(0, 8, "3. Schedule (First 3 Days)", ln=True)
+    pdf.cell(0, 8, "3. Schedule (First 3 Days)", new_x="LMARGIN", new_y="NEXT")
     pdf.set_font("Arial", size=9)
     
     schedule = study_plan.get('schedule', {})
     if 'error' not in schedule:
+        # Batch all schedule lines into a single multi_cell call
+        buf = io.StringIO()
         for day in schedule.get('schedule', [])[:3]:
-            pdf.cell(0, 5, f"Day {day.get('day')}: {day.get('date', 'N/A')}", ln=True)
+            buf.write(f"Day {day.get('day')}: {day.get('date', 'N/A')}\n")
             for session in day.get('sessions', [])[:2]:
-                pdf.cell(0, 4, f"  - {session.get('time')}: {session.get('topic')}", ln=True)
+                buf.write(f"  - {session.get('time')}: {session.get('topic')}\n")
+        pdf.multi_cell(0, 5, buf.getvalue().rstrip('\n'))
+    
+    # fpdf2 returns a bytearray, no latin1 round-trip needed
+    return bytes(pdf.output())
+
+# ========================================================================
+# PLAN STORAGE
+# ========================================================================
+
+def save_plan(plan_id, study_plan):
+    """Store a plan in memory and on disk"""
+    global _plan_store_last_sweep
+    
+    created = time.time()
+    with _plan_lock:
+        study_plans[plan_id] = (created, study_plan)
+        _store_put(_plan_store, plan_id, created, orjson.dumps(study_plan))
+        
+        if created - _plan_store_last_sweep > store_sweep_interval:
+            _store_sweep(_plan_store, plan_ttl)
+            _plan_store_last_sweep = created
+
+def load_plan(plan_id):
+    """Look up a plan in memory, falling back to the disk store"""
+    with _plan_lock:
+        cached = study_plans.get(plan_id)
+        if cached is not None:
+            created, study_plan = cached
+        else:
+            row = _store_get(_plan_store, plan_id)
+            if row is None:
+                return None
+            created, study_plan = row[0], orjson.loads(row[1])
+        
+        # Plans reloaded from disk keep their original creation time
+        if time.time() - created > plan_ttl:
+            study_plans.pop(plan_id, None)
+            _store_delete(_plan_store, plan_id)
+            return None
+        
+        study_plans[plan_id] = (created, study_plan)
+        return study_plan
+
+def load_plan_pdf(plan_id, study_plan):
+    """Return (pdf_bytes, etag) for a plan, rendering it only once"""
+    with _plan_lock:
+        cached = plan_pdfs.get(plan_id)
+    if cached is not None:
+        return cached
     
-    return pdf.output(dest='S').encode('latin1')
+    # Plans never change after generation, so the render can be reused
+    pdf_bytes = generate_study_plan_pdf(study_plan)
+    etag = hashlib.blake2b(pdf_bytes, digest_size=8).hexdigest()
+    with _plan_lock:
+        plan_pdfs[plan_id] = (pdf_bytes, etag)
+    return pdf_bytes, etag
+
+def delete_plan(plan_id):
+    """Remove a plan from memory and disk, returning whether it existed"""
+    with _plan_lock:
+        plan_pdfs.pop(plan_id, None)
+        found = study_plans.pop(plan_id, None) is not None
+        return _store_delete(_plan_store, plan_id) or found
+
+# ========================================================================
+# WARMUP
+# ========================================================================
+
+def _warmup():
+    """Preload lazily imported CrewAI/fpdf internals before the first request"""
+    try:
+        task = Task(description="ping", expected_output="pong", agent=syllabus_analyzers[0])
+        Crew(agents=[syllabus_analyzers[0]], tasks=[task], verbose=False)
+        
+        FPDF().add_page()
+        
+        # Optionally open the HTTPS connection to the LLM provider (costs a few tokens)
+        if os.environ.get("WARMUP_LLM", "0") == "1":
+            litellm.completion(model=llm, messages=[{"role": "user", "content": "ping"}], max_tokens=1)
+        
+        log.info("✓ Warmup complete")
+    except Exception as e:
+        log.warning("✗ Warmup failed: %s", e)
+
+threading.Thread(target=_warmup, daemon=True).start()
 
 # ========================================================================
 # FLASK ROUTES
@@ -338,82 +921,171 @@ def generate_study_plan_pdf(study_plan):
 def index():
     return render_template('index.html')
 
-@app.route('/api/generate-plan', methods=['POST'])
-def generate_plan():
-    """Generate study plan endpoint"""
-    print("\n[API] Generate plan request received")
+def _read_plan_request():
+    """Read plan parameters from the request, returning (params, (error, status))"""
+    # Reject oversized bodies before parsing them; chunked bodies without a
+    # Content-Length are cut off by MAX_CONTENT_LENGTH while being read
+    if request.content_length and request.content_length > MAX_SYLLABUS_BYTES:
+        return None, ('Request body is too large', 413)
     
     try:
-        # Get data
         if request.is_json:
             data = request.get_json()
         else:
             data = request.form.to_dict()
-        
-        syllabus_text = data.get('syllabus_text', '').strip()
-        learning_prefs = data.get('learning_preferences', '').strip()
+    except RequestEntityTooLarge:
+        return None, ('Request body is too large', 413)
+    
+    syllabus_text = data.get('syllabus_text', '').strip()
+    learning_prefs = data.get('learning_preferences', '').strip()
+    try:
         duration = int(data.get('study_duration_days', 30))
-        
-        # Validate
-        if not syllabus_text:
-            return jsonify({'error': 'Syllabus text is required'}), 400
-        
-        if not learning_prefs:
-            return jsonify({'error': 'Learning preferences are required'}), 400
-        
-        print(f"[API] Syllabus length: {len(syllabus_text)} chars")
-        print(f"[API] Duration: {duration} days")
+    except (TypeError, ValueError):
+        return None, ('Study duration must be a whole number of days', 400)
+    
+    # Validate
+    if not syllabus_text:
+        return None, ('Syllabus text is required', 400)
+    
+    if not 1 <= duration <= MAX_STUDY_DURATION_DAYS:
+        return None, (f'Study duration must be between 1 and {MAX_STUDY_DURATION_DAYS} days', 400)
+    
+    if not learning_prefs:
+        return None, ('Learning preferences are required', 400)
+    
+    log.info("[API] Syllabus length: %d chars", len(syllabus_text))
+    log.info("[API] Duration: %d days", duration)
+    
+    return (syllabus_text, learning_prefs, duration), None
+
+def _new_plan_id():
+    """Generate an id for a new plan"""
+    # Nanosecond timestamp plus random suffix so concurrent requests never collide
+    return f"plan_{time.time_ns():x}_{secrets.token_hex(3)}"
+
+def _plan_summary(study_plan):
+    """Summary fields returned when a plan is generated"""
+    return {
+        'created_at': study_plan['created_at'],
+        'duration_days': study_plan['duration_days'],
+        'total_estimated_hours': study_plan['syllabus_analysis'].get('total_estimated_hours', 'N/A'),
+        'failed_chunks': study_plan['syllabus_analysis'].get('failed_chunks', 0),
+        'primary_learning_style': study_plan['learning_analysis']['primary_learning_style']
+    }
+
+@app.route('/api/generate-plan', methods=['POST'])
+def generate_plan():
+    """Generate study plan endpoint"""
+    log.info("[API] Generate plan request received")
+    
+    try:
+        params, error = _read_plan_request()
+        if error:
+            message, status = error
+            return jsonify({'error': message}), status
         
         # Generate plan
-        study_plan = create_study_plan(syllabus_text, learning_prefs, duration)
+        study_plan = _run_async(create_study_plan(*params))
         
         # Store plan
-        plan_id = f"plan_{int(datetime.now().timestamp())}"
-        study_plans[plan_id] = study_plan
+        plan_id = _new_plan_id()
+        save_plan(plan_id, study_plan)
         
-        print(f"[API] ✓ Plan generated: {plan_id}")
+        log.info("[API] ✓ Plan generated: %s", plan_id)
         
         return jsonify({
             'success': True,
             'plan_id': plan_id,
             'message': 'Study plan generated successfully',
-            'summary': {
-                'created_at': study_plan['created_at'],
-                'duration_days': study_plan['duration_days'],
-                'total_estimated_hours': study_plan['syllabus_analysis'].get('total_estimated_hours', 'N/A'),
-                'primary_learning_style': study_plan['learning_analysis']['primary_learning_style']
-            }
+            'summary': _plan_summary(study_plan)
         }), 200
         
     except Exception as e:
-        print(f"[API] ✗ Error: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        log.exception("[API] ✗ Error: %s", e)
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/generate-plan/stream', methods=['POST'])
+def generate_plan_stream():
+    """Generate study plan, streaming each stage as newline-delimited JSON"""
+    log.info("[API] Streaming generate plan request received")
+    
+    try:
+        params, error = _read_plan_request()
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    if error:
+        message, status = error
+        return jsonify({'error': message}), status
+    
+    # Stage results are pushed from the event loop thread as they complete
+    events = queue.Queue()
+    future = asyncio.run_coroutine_threadsafe(
+        create_study_plan(*params, on_stage=lambda stage, data: events.put({'stage': stage, 'data': data})),
+        _event_loop
+    )
+    future.add_done_callback(lambda f: events.put(None))
+    
+    @stream_with_context
+    def stream():
+        while (event := events.get()) is not None:
+            yield orjson.dumps(event) + b"\n"
+        
+        try:
+            study_plan = future.result()
+        except Exception as e:
+            log.error("[API] ✗ Error: %s", e)
+            yield orjson.dumps({'stage': 'error', 'error': str(e)}) + b"\n"
+            return
+        
+        plan_id = _new_plan_id()
+        save_plan(plan_id, study_plan)
+        log.info("[API] ✓ Plan generated: %s", plan_id)
+        
+        yield orjson.dumps({
+            'stage': 'complete',
+            'plan_id': plan_id,
+            'summary': _plan_summary(study_plan)
+        }) + b"\n"
+    
+    return Response(stream(), mimetype='application/x-ndjson')
+
 @app.route('/api/plan/<plan_id>', methods=['GET'])
 def get_plan(plan_id):
     """Get plan details"""
-    if plan_id not in study_plans:
+    study_plan = load_plan(plan_id)
+    if study_plan is None:
         return jsonify({'error': 'Plan not found'}), 404
     
     return jsonify({
         'success': True,
-        'plan': study_plans[plan_id]
+        'plan': study_plan
     }), 200
 
+@app.route('/api/plan/<plan_id>', methods=['DELETE'])
+def remove_plan(plan_id):
+    """Delete a stored plan"""
+    if not delete_plan(plan_id):
+        return jsonify({'error': 'Plan not found'}), 404
+    
+    return jsonify({'success': True}), 200
+
 @app.route('/api/plan/<plan_id>/pdf', methods=['GET'])
 def download_pdf(plan_id):
     """Download plan as PDF"""
-    if plan_id not in study_plans:
+    study_plan = load_plan(plan_id)
+    if study_plan is None:
         return jsonify({'error': 'Plan not found'}), 404
     
     try:
-        pdf_bytes = generate_study_plan_pdf(study_plans[plan_id])
-        return pdf_bytes, 200, {
-            'Content-Type': 'application/pdf',
-            'Content-Disposition': f'attachment; filename=study_plan_{plan_id}.pdf'
-        }
+        pdf_bytes, etag = load_plan_pdf(plan_id, study_plan)
+        return send_file(
+            io.BytesIO(pdf_bytes),
+            mimetype='application/pdf',
+            as_attachment=True,
+            download_name=f'study_plan_{plan_id}.pdf',
+            etag=etag,
+            conditional=True
+        )
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -425,7 +1097,8 @@ def health():
         'service': 'Study Plan Generator',
         'agents': 3,
         'llm': llm,
-        'timestamp': datetime.now().isoformat()
+        'resource_llm': resource_llm,
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds')
     }), 200
 
 # ========================================================================
@@ -433,16 +1106,11 @@ def health():
 # ========================================================================
 
 if __name__ == '__main__':
-    print("\n" + "="*80)
-    print("STUDY PLAN GENERATOR - AI-POWERED WITH GROQ")
-    print("="*80)
-    print("\n✓ 3 CrewAI Agents Active:")
-    print("  1. Syllabus Analyzer")
-    print("  2. Schedule Architect")
-    print("  3. Resource Recommender")
-    print(f"\n✓ LLM: {llm}")
-    print("✓ Ready to generate personalized study plans!")
-    print("="*80 + "\n")
+    log.info("STUDY PLAN GENERATOR - AI-POWERED WITH GROQ")
+    log.info("✓ 3 CrewAI Agents Active: Syllabus Analyzer, Schedule Architect, Resource Recommender")
+    log.info("✓ LLM: %s", llm)
+    log.info("✓ Ready to generate personalized study plans!")
     
     port = int(os.environ.get('PORT', 5000))
-    app.run(host='0.0.0.0', port=port, debug=True)
\ No newline at end of file
+    debug = os.environ.get('FLASK_DEBUG', '0') == '1'
+    app.run(host='0.0.0.0', port=port, debug=debug, threaded=True)
\ No newline at end of file
@@ -0,0 +1,15 @@
+# gunicorn.conf.py
+import os
+
+# gevent workers overlap the network-bound LLM calls of concurrent requests.
+# The SQLite stores can be shared, but each worker caches plans in memory,
+# so a single worker keeps deletes visible to every request.
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+worker_class = "gevent"
+workers = int(os.environ.get("WEB_CONCURRENCY", 1))
+worker_connections = int(os.environ.get("WORKER_CONNECTIONS", 50))
+
+# Plan generation makes several LLM round trips
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 180))
+
+raw_env = ["GEVENT=1"]
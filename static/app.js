@@ -153,7 +153,7 @@ function displayPlanResults(result) {
     document.getElementById('results-screen').classList.add('active');
     
     // Update summary
-    document.getElementById('summary-plan-id').textContent = result.plan_id.substring(5, 15);
+    document.getElementById('summary-plan-id').textContent = result.plan_id.replace(/^plan_/, '');
     document.getElementById('summary-duration').textContent = `${result.summary.duration_days} days`;
     document.getElementById('summary-hours').textContent = result.summary.total_estimated_hours || 'Varies';
     document.getElementById('summary-style').textContent = result.summary.primary_learning_style || 'Mixed';